@@ -1,3 +1,3 @@
-from generator import PythonCodeGenerator, PythonExpressionCodeGenerator, \
+from .generator import PythonCodeGenerator, PythonExpressionCodeGenerator, \
     PythonAssignmentCodeGenerator, PythonFunctionCodeGenerator, PythonClassCodeGenerator, \
     PythonModuleCodeGenerator
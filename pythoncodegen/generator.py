@@ -1,81 +1,138 @@
 from __future__ import annotations
 
-import copy
+import sys
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Iterable
+from functools import lru_cache
+from typing import List, Tuple
+
+_NL = sys.intern('\n')
+_NL_NL = sys.intern('\n\n')
+
+_generation = 0
+
+
+@lru_cache(maxsize=None)
+def _indent(indentation_character: str, indentation_size: int, indentation_level: int):
+    return sys.intern((indentation_character * indentation_size) * indentation_level)
+
+
+@lru_cache(maxsize=None)
+def _pass_line(indentation_character: str, indentation_size: int, indentation_level: int):
+    return _indent(indentation_character, indentation_size, indentation_level) + 'pass\n'
 
 
 class PythonCodeGenerator(ABC):
+    __slots__ = ('_indentation_character', '_indentation_size', '_indentation_level',
+                 '_cached_str', '_cached_level', '_cached_generation')
+
     def __init__(self):
         self._indentation_character: str = ' '
         self._indentation_size: int = 4
         self._indentation_level: int = 0
-        self._indentation_str: str = ''
-        self._update_indentation_str()
+        self._cached_str: str = None
+        self._cached_level: int = -1
+        self._cached_generation: int = -1
 
     def __str__(self):
-        return self._generate_str()
+        if self._cached_str is not None and self._cached_level == self._indentation_level \
+                and self._cached_generation == _generation:
+            return self._cached_str
+        self._cached_str = self._generate_str()
+        self._cached_level = self._indentation_level
+        self._cached_generation = _generation
+        return self._cached_str
 
-    @abstractmethod
     def _generate_str(self):
+        buf: List[str] = []
+        self._render_into(buf.append)
+        return ''.join(buf)
+
+    def _render_into(self, write):
+        stack: List = [(self, self._indentation_level)]
+        while stack:
+            part = stack.pop()
+            if part.__class__ is str:
+                write(part)
+            else:
+                part[0]._emit(stack, *part[1:])
+
+    @abstractmethod
+    def _emit(self, stack: List, level: int):
         pass
 
     @abstractmethod
     def empty(self):
         pass
 
-    def _update_indentation_str(self):
-        self._indentation_str = self._indentation_character * self._indentation_size
+    def _indent(self, level: int):
+        return _indent(self._indentation_character, self._indentation_size, level)
+
+    def _pass_line(self, level: int):
+        return _pass_line(self._indentation_character, self._indentation_size, level)
+
+    def _invalidate_cached_str(self):
+        global _generation
+        _generation += 1
+        self._cached_str = None
+        self._cached_level = -1
 
     def set_indentation_character(self, indentation_character: str):
         if len(indentation_character) != 1:
             raise ValueError('Indentation character length should be of length 1.')
-        self._indentation_character = indentation_character
-        self._update_indentation_str()
+        if indentation_character != self._indentation_character:
+            self._indentation_character = indentation_character
+            self._invalidate_cached_str()
 
     def set_indentation_size(self, indentation_size: int):
         if indentation_size < 1:
             raise ValueError('Indentation size should be at least 1.')
-        self._indentation_size = indentation_size
-        self._update_indentation_str()
+        if indentation_size != self._indentation_size:
+            self._indentation_size = indentation_size
+            self._invalidate_cached_str()
 
     def set_indentation_level(self, indentation_level: int):
         if indentation_level < 0:
             raise ValueError('Indentation level should be greater than 0.')
-        self._indentation_level = indentation_level
-
-
-def update_indentation(python_code_generators: Iterable[PythonCodeGenerator], indentation_level: int):
-    for generator in python_code_generators:
-        generator.set_indentation_level(indentation_level)
+        if indentation_level != self._indentation_level:
+            self._indentation_level = indentation_level
+            self._invalidate_cached_str()
 
 
 class PythonExpressionCodeGenerator(PythonCodeGenerator):
+    __slots__ = ('_expression', '_tail')
+
     def __init__(self, expression: str):
         super(PythonExpressionCodeGenerator, self).__init__()
         self._expression = expression
+        self._tail = expression
 
-    def _generate_str(self):
-        return f'{self._indentation_str * self._indentation_level}{self._expression}'
+    def _emit(self, stack: List, level: int):
+        stack.append(self._indent(level) + self._tail)
 
     def empty(self):
         return False
 
 
 class PythonAssignmentCodeGenerator(PythonCodeGenerator):
+    __slots__ = ('_name', '_value', '_tail')
+
     def __init__(self, name: str, value: str):
         super(PythonAssignmentCodeGenerator, self).__init__()
         self._name = name
         self._value = value
+        self._tail = f'{name} = {value}\n'
 
-    def _generate_str(self):
-        return f'{self._indentation_str * self._indentation_level}{self._name} = {self._value}\n'
+    def _emit(self, stack: List, level: int):
+        stack.append(self._indent(level) + self._tail)
 
     def empty(self):
         return False
 
 
 class PythonFunctionCodeGenerator(PythonCodeGenerator):
+    __slots__ = ('_name', '_params', '_lines', '_decorators', '_params_str', '_sig_tail',
+                 '_decorator_block', '_accepts_static', '_render')
+
     def __init__(self,
                  name: str,
                  params: Tuple[str, ...],
@@ -84,125 +141,163 @@ class PythonFunctionCodeGenerator(PythonCodeGenerator):
         super(PythonFunctionCodeGenerator, self).__init__()
         self._name = name
         self._params = params
-        self._lines = lines
+        self._lines = tuple(PythonExpressionCodeGenerator(line) if isinstance(line, str) else line
+                            for line in lines)
         self._decorators = decorators
-        self._class_method = False
-
-    def _generate_signature(self):
-        base_indentation = self._indentation_str * self._indentation_level
-        decorators = list(self._decorators)
-        params = ', '.join(self._params)
-        if self._class_method:
-            decorators += ([f'{base_indentation}@staticmethod'] if len(self._params) == 0 else [])
-        decorators += ([''] if len(decorators) else [])
-        decorators = '\n'.join(decorators)
-        return f'{decorators}{base_indentation}def {self._name}({params}):\n'
-
-    def _generate_line(self, line):
-        indentation_level = self._indentation_level + 1
-        line.set_indentation_level(indentation_level)
-        return str(line)
-
-    def _generate_body(self):
+        self._params_str = ', '.join(params)
+        self._sig_tail = f'def {name}({self._params_str}):\n'
+        self._decorator_block = '\n'.join(decorators) + '\n' if decorators else ''
+        self._accepts_static = len(params) == 0
+        self._render = self._compile_render()
+
+    def _compile_render(self):
+        if not all(isinstance(line, (PythonExpressionCodeGenerator, PythonAssignmentCodeGenerator))
+                   for line in self._lines):
+            return None
+        tokens: List[Tuple[bool, str]] = []
+        if self._decorator_block:
+            tokens.append((True, self._decorator_block))
+        tokens.append((False, 'static_line'))
+        tokens.append((False, 'indent'))
+        tokens.append((True, self._sig_tail))
         if self.empty():
-            return f'{self._indentation_str * (self._indentation_level + 1)}pass\n'
-        lines = map(lambda line: f'{self._generate_line(line)}\n', self._lines)
-        return ''.join(lines)
-
-    def _generate_str(self):
-        signature = self._generate_signature()
-        body = self._generate_body()
-        return f'{signature}{body}'
+            tokens.append((False, 'body_indent'))
+            tokens.append((True, 'pass\n'))
+        else:
+            for line in self._lines:
+                tokens.append((False, 'body_indent'))
+                tokens.append((True, line._tail + '\n'))
+        folded: List[Tuple[bool, str]] = []
+        for is_constant, token in tokens:
+            if is_constant and folded and folded[-1][0]:
+                folded[-1] = (True, folded[-1][1] + token)
+            else:
+                folded.append((is_constant, token))
+        expression = ' + '.join(repr(token) if is_constant else token for is_constant, token in folded)
+        source = f'def _render(indent, body_indent, static_line):\n    return {expression}\n'
+        namespace = {}
+        exec(compile(source, '<codegen-render>', 'exec'), namespace)
+        return namespace['_render']
+
+    def _generate_signature(self, level: int, class_method: bool):
+        base_indentation = self._indent(level)
+        if class_method and self._accepts_static:
+            return f'{self._decorator_block}{base_indentation}@staticmethod\n{base_indentation}{self._sig_tail}'
+        return f'{self._decorator_block}{base_indentation}{self._sig_tail}'
+
+    def _render_applies(self):
+        if self._render is None:
+            return False
+        character = self._indentation_character
+        size = self._indentation_size
+        return all(line._indentation_character == character and line._indentation_size == size
+                   for line in self._lines)
+
+    def _emit(self, stack: List, level: int, class_method: bool = False):
+        if self._render_applies():
+            base_indentation = self._indent(level)
+            static_line = f'{base_indentation}@staticmethod\n' if class_method and self._accepts_static else ''
+            stack.append(self._render(base_indentation, self._indent(level + 1), static_line))
+            return
+        parts: List = [self._generate_signature(level, class_method)]
+        if self.empty():
+            parts.append(self._pass_line(level + 1))
+        else:
+            for line in self._lines:
+                parts.append((line, level + 1))
+                parts.append(_NL)
+        stack.extend(reversed(parts))
 
     def empty(self):
         return len(self._lines) == 0
 
-    def set_class_method(self, class_method: bool):
-        self._class_method = class_method
 
-    def set_indentation_level(self, indentation_level: int):
-        super(PythonFunctionCodeGenerator, self).set_indentation_level(indentation_level)
-        for line in self._lines:
-            if type(line) != str:
-                line.set_indentation_level(self._indentation_level + 1)
+class PythonClassCodeGenerator(PythonCodeGenerator):
+    __slots__ = ('_name', '_super_classes', '_sig_tail', '_children',
+                 '_attribute_count', '_nested_class_count')
 
+    _ATTRIBUTE = 0
+    _NESTED_CLASS = 1
+    _METHOD = 2
 
-class PythonClassCodeGenerator(PythonCodeGenerator):
     def __init__(self, name: str, super_classes: Tuple[str, ...]):
         super(PythonClassCodeGenerator, self).__init__()
         self._name = name
         self._super_classes = super_classes
-        self._class_attributes: List[PythonAssignmentCodeGenerator] = []
-        self._nested_class_generators: List[PythonClassCodeGenerator] = []
-        self._method_generators: List[PythonFunctionCodeGenerator] = []
+        self._sig_tail = f'class {name}({", ".join(super_classes)}):\n' if super_classes else f'class {name}:\n'
+        self._children: List[Tuple[int, PythonCodeGenerator]] = []
+        self._attribute_count = 0
+        self._nested_class_count = 0
 
-    def _generate_signature(self):
-        base_indentation = self._indentation_str * self._indentation_level
-        super_classes = f'({", ".join(self._super_classes)})' if len(self._super_classes) else ''
-        return f'{base_indentation}class {self._name}{super_classes}:\n'
+    def _generate_signature(self, level: int):
+        return self._indent(level) + self._sig_tail
 
-    def _generate_body(self):
+    def _emit(self, stack: List, level: int):
+        parts: List = [self._generate_signature(level)]
         if self.empty():
-            return f'{self._indentation_str * (self._indentation_level + 1)}pass\n'
-
-        class_attributes = ''.join(map(lambda attribute: str(attribute), self._class_attributes))
-        nested_classes = '\n'.join(map(lambda nested_class: str(nested_class), self._nested_class_generators))
-        methods = '\n'.join(map(lambda method: str(method), self._method_generators))
-        first_separator = '\n' if len(self._class_attributes) > 0 else ''
-        second_separator = '\n' if len(self._nested_class_generators) > 0 else ''
-        return f'{class_attributes}{first_separator}{nested_classes}{second_separator}{methods}'
-
-    def _generate_str(self):
-        signature = self._generate_signature()
-        body = self._generate_body()
-        return f'{signature}{body}'
+            parts.append(self._pass_line(level + 1))
+            stack.extend(reversed(parts))
+            return
+        previous_tag = -1
+        for tag, child in self._children:
+            if previous_tag != -1 and not (previous_tag == self._ATTRIBUTE and tag == self._ATTRIBUTE):
+                parts.append(_NL)
+            parts.append((child, level + 1, True) if tag == self._METHOD else (child, level + 1))
+            previous_tag = tag
+        if previous_tag != self._METHOD:
+            parts.append(_NL)
+        stack.extend(reversed(parts))
 
     def empty(self):
-        return len(self._class_attributes) == 0 and len(self._nested_class_generators) == 0 and \
-               len(self._method_generators) == 0
+        return len(self._children) == 0
 
     def add_class_attribute(self, assignment_code_generator: PythonAssignmentCodeGenerator):
-        assignment_code_generator.set_indentation_level(self._indentation_level + 1)
-        self._class_attributes.append(assignment_code_generator)
+        self._children.insert(self._attribute_count, (self._ATTRIBUTE, assignment_code_generator))
+        self._attribute_count += 1
+        self._invalidate_cached_str()
 
     def add_method(self, function_code_generator: PythonFunctionCodeGenerator):
-        function_code_generator.set_class_method(True)
-        function_code_generator.set_indentation_level(self._indentation_level + 1)
-        self._method_generators.append(function_code_generator)
+        self._children.append((self._METHOD, function_code_generator))
+        self._invalidate_cached_str()
 
     def add_nested_class(self, class_code_generator: PythonClassCodeGenerator):
-        class_code_generator.set_indentation_level(self._indentation_level + 1)
-        self._nested_class_generators.append(class_code_generator)
-
-    def set_indentation_level(self, indentation_level: int):
-        super(PythonClassCodeGenerator, self).set_indentation_level(indentation_level)
-        code_generator_iterables = [self._class_attributes, self._method_generators, self._nested_class_generators]
-        for generator_iterable in code_generator_iterables:
-            update_indentation(generator_iterable, self._indentation_level + 1)
+        self._children.insert(self._attribute_count + self._nested_class_count,
+                              (self._NESTED_CLASS, class_code_generator))
+        self._nested_class_count += 1
+        self._invalidate_cached_str()
 
 
 class PythonModuleCodeGenerator(PythonCodeGenerator):
+    __slots__ = ('_name', '_path', '_components')
+
     def __init__(self, name, path):
         super(PythonModuleCodeGenerator, self).__init__()
         self._name = name
         self._path = path
         self._components: List[PythonCodeGenerator] = []
 
-    def _generate_str(self):
-        components = map(lambda component: str(component), self._components)
-        module_code = '\n\n'.join(components)
-        return f'\n\n{module_code}\n'
+    def _emit(self, stack: List, level: int):
+        parts: List = [_NL_NL]
+        for component in self._components:
+            parts.append((component, level))
+            parts.append(_NL_NL)
+        if self._components:
+            parts[-1] = _NL
+        else:
+            parts.append(_NL)
+        stack.extend(reversed(parts))
 
     def empty(self):
         return len(self._components) == 0
 
     def add_component(self, component: PythonCodeGenerator):
         self._components.append(component)
+        self._invalidate_cached_str()
 
     def save(self):
         file_path = f'{self._path}/{self._name}.py'
-        with open(file_path, 'w') as outfile:
-            outfile.write(str(self))
+        with open(file_path, 'w', buffering=1 << 20) as outfile:
+            self._render_into(outfile.write)
 
 
 if __name__ == '__main__':
@@ -243,7 +338,7 @@ if __name__ == '__main__':
         'Meta',
         ()
     )
-    some_metaclass.add_method(copy.deepcopy(init_method))
+    some_metaclass.add_method(init_method)
     # print(some_metaclass)
     """
     class Meta:
@@ -255,11 +350,11 @@ if __name__ == '__main__':
         'Person',
         ()
     )
-    person_class.add_class_attribute(copy.deepcopy(PythonAssignmentCodeGenerator('first_name', '\'Will\'')))
-    person_class.add_class_attribute(copy.deepcopy(PythonAssignmentCodeGenerator('last_name', '\'Smith\'')))
-    person_class.add_nested_class(copy.deepcopy(some_metaclass))
-    person_class.add_method(copy.deepcopy(hello_function))
-    person_class.add_method(copy.deepcopy(hello_name_function))
+    person_class.add_class_attribute(PythonAssignmentCodeGenerator('first_name', '\'Will\''))
+    person_class.add_class_attribute(PythonAssignmentCodeGenerator('last_name', '\'Smith\''))
+    person_class.add_nested_class(some_metaclass)
+    person_class.add_method(hello_function)
+    person_class.add_method(hello_name_function)
     # print(person_class)
     """
     class Person:
@@ -279,9 +374,9 @@ if __name__ == '__main__':
     """
 
     tutorial_module = PythonModuleCodeGenerator('tutorial', '.')
-    tutorial_module.add_component(copy.deepcopy(hello_function))
-    tutorial_module.add_component(copy.deepcopy(hello_name_function))
-    tutorial_module.add_component(copy.deepcopy(some_metaclass))
-    tutorial_module.add_component(copy.deepcopy(person_class))
+    tutorial_module.add_component(hello_function)
+    tutorial_module.add_component(hello_name_function)
+    tutorial_module.add_component(some_metaclass)
+    tutorial_module.add_component(person_class)
     # print(tutorial_module)
     tutorial_module.save()
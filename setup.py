@@ -1,8 +1,21 @@
-from distutils.core import setup
+from setuptools import setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    try:
+        ext_modules = cythonize(['pythoncodegen/generator.py'],
+                                compiler_directives={'language_level': '3'})
+    except Exception as error:
+        print(f'Cython translation of pythoncodegen.generator failed ({error}); '
+              f'falling back to the pure-Python module.')
+        ext_modules = []
 
 setup(
     name='python-codegen',
-    packages=['python-codegen'],
+    packages=['pythoncodegen'],
     version='0.1',
     license='MIT',
     description='Python code generator written in Python',
@@ -12,6 +25,7 @@ setup(
     download_url='https://github.com/gonzalejandro/python-codegen/archive/refs/tags/0.1.tar.gz',
     keywords=['Python', 'Code', 'Generator'],
     install_requires=[],
+    ext_modules=ext_modules,
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',